@@ -0,0 +1,56 @@
+"""
+Database helpers shared by the data-ingest and data-output services.
+It reads the database configuration from the environment, waits for MySQL to come up, and manages connections.
+"""
+
+# images/common/db_utils.py
+
+import mysql.connector
+import os
+import time
+from contextlib import contextmanager
+from typing import Dict, Any, Iterator, Tuple
+
+def get_db_config(**overrides: Any) -> Dict[str, Any]:
+    """Get database connection settings from environment variables"""
+    config = {
+        'host': os.getenv('DB_HOST', 'database'),
+        'user': os.getenv('DB_USER', 'codetest'),
+        'password': os.getenv('DB_PASSWORD', 'swordfish'),
+        'database': os.getenv('DB_NAME', 'codetest'),
+        'port': int(os.getenv('DB_PORT', '3306')),
+        'charset': 'utf8mb4'
+    }
+    config.update(overrides)
+    return config
+
+def wait_for_database(config: Dict[str, Any], max_retries: int = 30,
+                      base_delay: float = 0.1, max_delay: float = 5.0) -> None:
+    """Wait for database to be ready"""
+    for attempt in range(max_retries):
+        try:
+            # short connect timeout so an unreachable host fails fast
+            conn = mysql.connector.connect(**config, connection_timeout=1)
+            conn.close()
+            print("Database is ready!")
+            return
+        except mysql.connector.Error as e:
+            # exponential backoff, capped at max_delay
+            delay = min(base_delay * 2 ** attempt, max_delay)
+            print(f"Attempt {attempt + 1}: Database not ready. Waiting {delay:.1f}s... ({e})")
+            time.sleep(delay)
+    
+    raise Exception("Database not available after maximum retries")
+
+@contextmanager
+def connect(config: Dict[str, Any]) -> Iterator[Tuple[Any, Any]]:
+    """Open a connection and cursor, closing both when done"""
+    conn = mysql.connector.connect(**config)
+    cursor = None
+    try:
+        cursor = conn.cursor()
+        yield conn, cursor
+    finally:
+        if cursor is not None:
+            cursor.close()
+        conn.close()
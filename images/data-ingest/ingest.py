@@ -6,23 +6,20 @@ It reads people and places data, inserts them into the database, and handles for
 #!/usr/bin/env python3
 # images/data-ingest/ingest.py
 
-import mysql.connector
-import pandas as pd
+import csv
+import itertools
 import os
-import time
 import sys
-from typing import Dict, Any
+import tempfile
+from functools import partial
+from multiprocessing import Pool
+from typing import Dict, Any, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+from db_utils import connect, get_db_config, wait_for_database
 
 def get_config() -> Dict[str, Any]:
     """Get configuration from environment variables"""
-    return {
-        # database config
-        'db_host': os.getenv('DB_HOST', 'database'),
-        'db_user': os.getenv('DB_USER', 'codetest'),
-        'db_password': os.getenv('DB_PASSWORD', 'swordfish'),
-        'db_name': os.getenv('DB_NAME', 'codetest'),
-        'db_port': int(os.getenv('DB_PORT', '3306')),
-        
+    config: Dict[str, Any] = {
         # file paths
         'data_path': os.getenv('DATA_PATH', '/app/data'),
         'people_file': os.getenv('PEOPLE_FILE', 'people.csv'),
@@ -31,101 +28,383 @@ def get_config() -> Dict[str, Any]:
         # processing config
         'max_retries': int(os.getenv('MAX_DB_RETRIES', '30')),
         'encoding': os.getenv('FILE_ENCODING', 'utf-8'),
+        'batch_size': int(os.getenv('BATCH_SIZE', '5000')),
+        'commit_every': int(os.getenv('COMMIT_EVERY_BATCHES', '0')),  # 0 = one transaction per table
+        'load_method': os.getenv('LOAD_METHOD', 'infile'),  # 'infile' or 'executemany'
+        'read_chunk_size': int(os.getenv('READ_CHUNK_SIZE', '50000')),
+        'workers': int(os.getenv('INGEST_WORKERS', '1')),  # >1 loads people in parallel
     }
+    
+    # a zero or negative size would fail deep in the load (or load nothing)
+    if config['batch_size'] <= 0:
+        raise ValueError(f"BATCH_SIZE must be positive, got {config['batch_size']}")
+    if config['read_chunk_size'] <= 0:
+        raise ValueError(f"READ_CHUNK_SIZE must be positive, got {config['read_chunk_size']}")
+    
+    return config
+
+def chunks(seq: Sequence, n: int) -> Iterator[Sequence]:
+    """Yield successive n-sized slices from seq"""
+    for i in range(0, len(seq), n):
+        yield seq[i:i + n]
+
+def insert_in_batches(conn, cursor, query: str, rows: List[tuple], batch_size: int, commit_every: int) -> None:
+    """Run executemany over rows in batches, optionally committing every commit_every batches"""
+    # executemany sends each batch as one multi-row INSERT; keep each
+    # round-trip well under max_allowed_packet
+    for batch_number, batch in enumerate(chunks(rows, batch_size), start=1):
+        cursor.executemany(query, batch)
+        if commit_every and batch_number % commit_every == 0:
+            conn.commit()
+
+def read_csv_header(path: str, required: Iterable[str]) -> Tuple[List[str], int, str]:
+    """Read a CSV header, returning the column names, the byte offset of the first data row and the line terminator"""
+    with open(path, 'rb') as f:
+        header_line = f.readline()
+        data_start = f.tell()
+    # LOAD DATA needs the terminator spelled out; assume the header's holds for every row
+    line_terminator = '\r\n' if header_line.endswith(b'\r\n') else '\n'
+    header = next(csv.reader([header_line.decode('utf-8')]))
+    missing = set(required) - set(header)
+    if missing:
+        raise ValueError(f"{os.path.basename(path)} is missing columns: {', '.join(sorted(missing))}")
+    return header, data_start, line_terminator
+
+# LINES TERMINATED BY literals for the terminators read_csv_header detects
+SQL_LINE_TERMINATORS = {'\n': "'\\n'", '\r\n': "'\\r\\n'"}
+
+def sql_fits(column: str) -> str:
+    """SQL condition: the trimmed column is non-empty and fits the VARCHAR(255) it ends up in"""
+    return f"TRIM({column}) <> '' AND CHAR_LENGTH(TRIM({column})) <= 255"
+
+PLACES_COLUMNS = ['city', 'county', 'country']
+PEOPLE_COLUMNS = ['given_name', 'family_name', 'date_of_birth', 'place_of_birth']
+STAGE_COLUMNS = {'places': PLACES_COLUMNS, 'people': PEOPLE_COLUMNS}
+
+# what a staged row needs to be loaded; county is optional
+STAGE_VALID = {
+    'places': f"""
+        {sql_fits('city')} AND {sql_fits('country')}
+        AND COALESCE(CHAR_LENGTH(TRIM(county)) <= 255, TRUE)
+    """,
+    'people': f"""
+        {sql_fits('given_name')} AND {sql_fits('family_name')} AND {sql_fits('place_of_birth')}
+        AND DATE_FORMAT(STR_TO_DATE(TRIM(date_of_birth), '%Y-%m-%d'), '%Y-%m-%d') = TRIM(date_of_birth)
+    """,
+}
+
+# LOAD DATA warnings for rows with too few or too many fields; short rows leave
+# NULLs that reject_invalid_rows reports, and extra fields are ignored like csv does
+ROW_LENGTH_WARNINGS = {1261, 1262}
+
+def create_stage(cursor, table: str) -> None:
+    """Create the temporary table the raw CSV values for table are staged in, as text"""
+    # everything is staged as nullable text so nothing is coerced or truncated
+    # on the way in; values are validated and converted on the way out
+    definitions = ', '.join(f'{name} TEXT' for name in STAGE_COLUMNS[table])
+    cursor.execute(f"""
+    CREATE TEMPORARY TABLE {table}_stage (
+        line_number INT UNSIGNED AUTO_INCREMENT PRIMARY KEY,
+        {definitions}
+    ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci
+    """)
+
+def stage_infile(cursor, table: str, path: str, header: List[str], line_terminator: str,
+                 ignore_lines: int = 1) -> None:
+    """Load a raw CSV straight into the stage table for table"""
+    # map the CSV columns onto the stage columns in whatever order the header has them
+    columns = ', '.join(name if name in STAGE_COLUMNS[table] else '@unused' for name in header)
+    
+    # ESCAPED BY '' keeps backslashes (and a literal \N) as typed, like the csv module does
+    load_query = f"""
+    LOAD DATA LOCAL INFILE '{path}'
+    INTO TABLE {table}_stage
+    CHARACTER SET utf8mb4
+    FIELDS TERMINATED BY ',' OPTIONALLY ENCLOSED BY '"' ESCAPED BY ''
+    LINES TERMINATED BY {SQL_LINE_TERMINATORS[line_terminator]}
+    IGNORE {ignore_lines} LINES
+    ({columns})
+    """
+    
+    cursor.execute(load_query)
+    
+    # LOAD DATA LOCAL behaves as if IGNORE were given, so anything else that
+    # went wrong is only a warning; don't load on top of it
+    if cursor.warning_count:
+        cursor.execute("SHOW WARNINGS")
+        unexpected = [message for _, code, message in cursor.fetchall() if code not in ROW_LENGTH_WARNINGS]
+        if unexpected:
+            raise ValueError(f"Loading {os.path.basename(path)} gave warnings: {'; '.join(unexpected[:5])}")
 
-def wait_for_database(config: Dict[str, Any], max_retries: int = 30) -> None:
-    """Wait for database to be ready."""
-    for attempt in range(max_retries):
-        try:
-            conn = mysql.connector.connect(**config)
-            conn.close()
-            print("Database is ready!")
-            return
-        except mysql.connector.Error as e:
-            print(f"Attempt {attempt + 1}: Database not ready. Waiting... ({e})")
-            time.sleep(2)
-    
-    raise Exception("Database not available after maximum retries")
-
-def load_places_data(cursor, data_path: str) -> Dict[str, int]:
-    """Load places data and return mapping of place descriptions to IDs"""
+def stage_batches(conn, cursor, table: str, records: Iterable[Dict[str, str]], batch_size: int,
+                  commit_every: int, chunk_size: int = 50_000) -> None:
+    """Take CSV records in chunks and executemany each chunk into the stage table for table"""
+    columns = STAGE_COLUMNS[table]
+    insert_query = f"""
+    INSERT INTO {table}_stage ({', '.join(columns)})
+    VALUES ({', '.join(['%s'] * len(columns))})
+    """
+    
+    # work through the records in chunks so memory stays bounded by chunk_size;
+    # a short row gives None for its missing fields, as LOAD DATA gives NULL
+    records = iter(records)
+    while chunk := list(itertools.islice(records, chunk_size)):
+        rows = [tuple(r[name] for name in columns) for r in chunk]
+        insert_in_batches(conn, cursor, insert_query, rows, batch_size, commit_every)
+
+def reject_invalid_rows(cursor, table: str) -> int:
+    """Delete blank lines and report and delete invalid rows in the stage table for table, returning the invalid count"""
+    columns = STAGE_COLUMNS[table]
+    
+    # a blank line loads as a single empty field (csv.DictReader skips them)
+    missing = ' + '.join(f'({name} IS NULL)' for name in columns)
+    cursor.execute(f"""
+    DELETE FROM {table}_stage
+    WHERE CONCAT_WS('', {', '.join(columns)}) = '' AND {missing} >= {len(columns) - 1}
+    """)
+    
+    # a plain SELECT, so a bad date is just NULL here rather than an error
+    cursor.execute(f"""
+    SELECT line_number, {', '.join(columns)}
+    FROM {table}_stage
+    WHERE NOT COALESCE({STAGE_VALID[table]}, FALSE)
+    """)
+    invalid = cursor.fetchall()
+    for _, *values in invalid:
+        print(f"Warning: Skipping invalid {table} row: {', '.join('' if v is None else v for v in values)}")
+    
+    cursor.executemany(f"DELETE FROM {table}_stage WHERE line_number = %s",
+                       [(line_number,) for line_number, *_ in invalid])
+    return len(invalid)
+
+def load_places_data(conn, cursor, data_path: str, batch_size: int = 5000, commit_every: int = 0,
+                     load_method: str = 'infile') -> None:
+    """Load places data"""
     places_file = os.path.join(data_path, 'places.csv')
     
     if not os.path.exists(places_file):
         raise FileNotFoundError(f"Places file not found: {places_file}")
     
-    # read places CSV
-    places_df = pd.read_csv(places_file, encoding='utf-8')
-    city_to_id_mapping = {}
+    header, _, line_terminator = read_csv_header(places_file, PLACES_COLUMNS)
     
-    print(f"Loading {len(places_df)} places...")
+    print("Loading places...")
     
-    for _, row in places_df.iterrows():
-        city = row['city'].strip()
-        county = row['county'].strip() if pd.notna(row['county']) else None
-        country = row['country'].strip()
-        
-        # insert to get place ID
-        insert_query = """
-        INSERT INTO places (city, county, country) 
-        VALUES (%s, %s, %s) 
-        ON DUPLICATE KEY UPDATE id=LAST_INSERT_ID(id)
-        """
+    # stage into a temporary table, then de-duplicate on the way into places
+    create_stage(cursor, 'places')
+    
+    if load_method == 'infile':
+        stage_infile(cursor, 'places', places_file, header, line_terminator)
+    else:
+        with open(places_file, newline='', encoding='utf-8') as f:
+            stage_batches(conn, cursor, 'places', csv.DictReader(f), batch_size, commit_every)
+    
+    reject_invalid_rows(cursor, 'places')
+    
+    # treat an empty county as NULL, and insert in file order so ids follow it
+    cursor.execute("""
+    INSERT INTO places (city, county, country)
+    SELECT TRIM(city), NULLIF(TRIM(county), ''), TRIM(country)
+    FROM places_stage
+    ORDER BY line_number
+    ON DUPLICATE KEY UPDATE id=LAST_INSERT_ID(id)
+    """)
+    cursor.execute("DROP TEMPORARY TABLE places_stage")
+    
+    cursor.execute("SELECT COUNT(*) FROM places")
+    print(f"Loaded {cursor.fetchone()[0]} unique places")
+
+def insert_staged_people(cursor) -> Tuple[int, int]:
+    """Copy people_stage into people via a join with places, returning (inserted, failed) counts"""
+    failed_inserts = reject_invalid_rows(cursor, 'people')
+    
+    # simple city matching - just look up the city name, compared exactly
+    # (binary) after lowercasing; if a city name were ever repeated across
+    # counties the most recently inserted place wins
+    place_lookup = """
+    SELECT LOWER(city) COLLATE utf8mb4_bin AS city_lower, MAX(id) AS id
+    FROM places
+    GROUP BY city_lower
+    """
+    city_lower = "LOWER(TRIM(s.place_of_birth)) COLLATE utf8mb4_bin"
+    
+    cursor.execute(f"""
+    INSERT INTO people (first_name, last_name, date_of_birth, place_of_birth_id)
+    SELECT TRIM(s.given_name), TRIM(s.family_name), TRIM(s.date_of_birth), p.id
+    FROM people_stage s
+    JOIN ({place_lookup}) p ON p.city_lower = {city_lower}
+    """)
+    successful_inserts = cursor.rowcount
+    
+    cursor.execute(f"""
+    SELECT {city_lower} AS city_of_birth, COUNT(*)
+    FROM people_stage s
+    LEFT JOIN ({place_lookup}) p ON p.city_lower = {city_lower}
+    WHERE p.id IS NULL
+    GROUP BY city_of_birth
+    """)
+    for city_of_birth, count in cursor.fetchall():
+        print(f"Warning: Could not find place ID for {city_of_birth} ({count} people)")
+        failed_inserts += count
+    
+    cursor.execute("DROP TEMPORARY TABLE people_stage")
+    
+    return successful_inserts, failed_inserts
+
+def load_people_data(conn, cursor, data_path: str, batch_size: int = 5000, commit_every: int = 0,
+                     load_method: str = 'infile', chunk_size: int = 50_000) -> None:
+    """Load people data, resolving place of birth against places in SQL"""
+    people_file = os.path.join(data_path, 'people.csv')
+    
+    if not os.path.exists(people_file):
+        raise FileNotFoundError(f"People file not found: {people_file}")
+    
+    header, _, line_terminator = read_csv_header(people_file, PEOPLE_COLUMNS)
+    
+    print("Loading people...")
+    
+    # stage the people rows, then let MySQL match them up with places
+    create_stage(cursor, 'people')
+    
+    if load_method == 'infile':
+        stage_infile(cursor, 'people', people_file, header, line_terminator)
+    else:
+        with open(people_file, newline='', encoding='utf-8') as f:
+            stage_batches(conn, cursor, 'people', csv.DictReader(f), batch_size, commit_every, chunk_size)
+    
+    successful_inserts, failed_inserts = insert_staged_people(cursor)
+    
+    print(f"Successfully inserted {successful_inserts} people, failed: {failed_inserts}")
+
+def read_line_range(path: str, start: int, end: int) -> Iterator[str]:
+    """Yield the decoded lines of a file that start within the byte range [start, end)"""
+    with open(path, 'rb') as f:
+        # move to the first line that starts at or after start; a line that
+        # straddles start belongs to the previous range
+        f.seek(start - 1)
+        f.readline()
+        while f.tell() < end:
+            line = f.readline()
+            if not line:
+                break
+            yield line.decode('utf-8')
+
+def load_people_range(start: int, end: int, *, db_config: Dict[str, Any], people_file: str, header: List[str],
+                      line_terminator: str, batch_size: int, commit_every: int, load_method: str,
+                      chunk_size: int) -> Tuple[int, int]:
+    """Worker: load the people rows in one byte range over its own connection, returning (inserted, failed) counts"""
+    with connect(db_config) as (conn, cursor):
+        # session settings aren't shared, so each worker defers its own checks
+        cursor.execute("SET SESSION unique_checks = 0")
+        cursor.execute("SET SESSION foreign_key_checks = 0")
+        cursor.execute("START TRANSACTION")
+        create_stage(cursor, 'people')
         
-        cursor.execute(insert_query, (city, county, country))
-        place_id = cursor.lastrowid
+        lines = read_line_range(people_file, start, end)
+        if load_method == 'infile':
+            # copy this range to its own file and load it raw
+            with tempfile.NamedTemporaryFile('w', suffix='.csv', encoding='utf-8', newline='') as tmp:
+                tmp.writelines(lines)
+                tmp.flush()
+                stage_infile(cursor, 'people', tmp.name, header, line_terminator, ignore_lines=0)
+        else:
+            stage_batches(conn, cursor, 'people', csv.DictReader(lines, fieldnames=header),
+                          batch_size, commit_every, chunk_size)
         
-       # simple mapping: city name -> place ID
-        city_to_id_mapping[city.lower()] = place_id
+        counts = insert_staged_people(cursor)
+        conn.commit()
     
-    print(f"Loaded {len(city_to_id_mapping)} unique places")
-    return city_to_id_mapping
+    return counts
 
-def load_people_data(cursor, data_path: str, city_to_id_mapping: Dict[str, int]) -> None:
-    """Load people data using place ID mapping"""
+def load_people_data_parallel(db_config: Dict[str, Any], data_path: str, workers: int,
+                              batch_size: int = 5000, commit_every: int = 0,
+                              load_method: str = 'infile', chunk_size: int = 50_000) -> None:
+    """Load people data with a pool of worker processes, one byte range of the CSV each"""
     people_file = os.path.join(data_path, 'people.csv')
     
     if not os.path.exists(people_file):
         raise FileNotFoundError(f"People file not found: {people_file}")
     
-    # read people CSV
-    people_df = pd.read_csv(people_file, encoding='utf-8')
-    
-    print(f"Loading {len(people_df)} people...")
-    
-    successful_inserts = 0
-    failed_inserts = 0
-    
-    for _, row in people_df.iterrows():
-        try:
-            first_name = row['given_name'].strip()
-            last_name = row['family_name'].strip()
-            date_of_birth = row['date_of_birth']
-            city_of_birth = row['place_of_birth'].strip()
-            
-            # simple city matching - just look up the city name
-            place_id = city_to_id_mapping.get(city_of_birth.lower())
-            
-            if place_id is None:
-                print(f"Warning: Could not find place ID for {city_of_birth}")
-                failed_inserts += 1
-                continue
-            
-            # insert person
-            insert_query = """
-            INSERT INTO people (first_name, last_name, date_of_birth, place_of_birth_id)
-            VALUES (%s, %s, %s, %s)
-            """
-            
-            cursor.execute(insert_query, (first_name, last_name, date_of_birth, place_id))
-            successful_inserts += 1
-            
-        except Exception as e:
-            print(f"Error inserting person {row.get('first_name', 'Unknown')}: {e}")
-            failed_inserts += 1
+    # split the data rows (not the header) into equal byte ranges; assumes no
+    # quoted field contains a newline
+    header, data_start, line_terminator = read_csv_header(people_file, PEOPLE_COLUMNS)
+    size = os.path.getsize(people_file) - data_start
+    ranges = [
+        (data_start + i * size // workers, data_start + (i + 1) * size // workers)
+        for i in range(workers)
+    ]
+    
+    # everything but the byte range is the same for every worker
+    load_range = partial(load_people_range, db_config=db_config, people_file=people_file, header=header,
+                         line_terminator=line_terminator, batch_size=batch_size, commit_every=commit_every,
+                         load_method=load_method, chunk_size=chunk_size)
+    
+    print(f"Loading people with {workers} workers...")
+    
+    with Pool(workers) as pool:
+        results = pool.starmap(load_range, ranges)
+    
+    successful_inserts = sum(inserted for inserted, _ in results)
+    failed_inserts = sum(failed for _, failed in results)
     
     print(f"Successfully inserted {successful_inserts} people, failed: {failed_inserts}")
 
+PEOPLE_PLACE_INDEX = 'idx_people_place_of_birth'
+
+# the foreign key as schema.sql declares it (MySQL names an unnamed key
+# people_ibfk_1), used if an earlier run died after dropping it
+PEOPLE_PLACE_FOREIGN_KEY = {'name': 'people_ibfk_1', 'update_rule': 'RESTRICT', 'delete_rule': 'RESTRICT'}
+
+def find_people_place_foreign_key(cursor) -> Optional[Dict[str, str]]:
+    """Look up the foreign key from people.place_of_birth_id to places, with its ON UPDATE / ON DELETE rules"""
+    cursor.execute("""
+    SELECT rc.CONSTRAINT_NAME, rc.UPDATE_RULE, rc.DELETE_RULE
+    FROM information_schema.REFERENTIAL_CONSTRAINTS rc
+    JOIN information_schema.KEY_COLUMN_USAGE k
+      ON k.CONSTRAINT_SCHEMA = rc.CONSTRAINT_SCHEMA AND k.CONSTRAINT_NAME = rc.CONSTRAINT_NAME
+     AND k.TABLE_NAME = rc.TABLE_NAME
+    WHERE rc.CONSTRAINT_SCHEMA = DATABASE() AND rc.TABLE_NAME = 'people'
+      AND rc.REFERENCED_TABLE_NAME = 'places' AND k.COLUMN_NAME = 'place_of_birth_id'
+    """)
+    rows = cursor.fetchall()
+    if not rows:
+        return None
+    name, update_rule, delete_rule = rows[0]
+    return {'name': name, 'update_rule': update_rule, 'delete_rule': delete_rule}
+
+def has_people_place_index(cursor) -> bool:
+    """Check whether people still has the place_of_birth_id index"""
+    cursor.execute("""
+    SELECT COUNT(*) FROM information_schema.STATISTICS
+    WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = 'people' AND INDEX_NAME = %s
+    """, (PEOPLE_PLACE_INDEX,))
+    return cursor.fetchone()[0] > 0
+
+def drop_people_place_index(cursor) -> None:
+    """Drop the people place_of_birth_id index, and the foreign key that needs it, if they exist"""
+    # InnoDB won't drop an index a foreign key depends on, so drop the key too
+    foreign_key = find_people_place_foreign_key(cursor)
+    if foreign_key:
+        cursor.execute(f"ALTER TABLE people DROP FOREIGN KEY {foreign_key['name']}")
+    if has_people_place_index(cursor):
+        cursor.execute(f"ALTER TABLE people DROP INDEX {PEOPLE_PLACE_INDEX}")
+
+def ensure_people_place_index(cursor, foreign_key: Dict[str, str]) -> None:
+    """Add the people place_of_birth_id index and foreign key back if either is missing"""
+    # re-check the schema rather than trusting what this run dropped, so a run
+    # that died after the drop is repaired by the next one; one sort-based
+    # index build instead of a B-tree insert per row, and with
+    # foreign_key_checks off the foreign key is added without re-checking rows
+    alterations = []
+    if not has_people_place_index(cursor):
+        alterations.append(f"ADD INDEX {PEOPLE_PLACE_INDEX} (place_of_birth_id)")
+    if not find_people_place_foreign_key(cursor):
+        alterations.append(
+            f"ADD CONSTRAINT {foreign_key['name']} FOREIGN KEY (place_of_birth_id) REFERENCES places(id) "
+            f"ON UPDATE {foreign_key['update_rule']} ON DELETE {foreign_key['delete_rule']}"
+        )
+    if alterations:
+        cursor.execute(f"ALTER TABLE people {', '.join(alterations)}")
+
 def main():
     """Main ingest function"""
     print("Starting data ingest...")
@@ -134,63 +413,96 @@ def main():
     config = get_config()
     
     # database configuration
-    db_config = {
-        'host': config['db_host'],
-        'user': config['db_user'],
-        'password': config['db_password'],
-        'database': config['db_name'],
-        'charset': 'utf8mb4'
-    }
+    db_config = get_db_config(
+        allow_local_infile=True  # needed for LOAD DATA LOCAL INFILE
+    )
     
     data_path = 'data/'
     
     try:
         # wait for database to be ready
-        wait_for_database(db_config)
+        wait_for_database(db_config, config['max_retries'])
         
         # connect to database
-        conn = mysql.connector.connect(**db_config)
-        cursor = conn.cursor()
-
-        # clear existing data before loading new data
-        print("Clearing existing data...")
-        cursor.execute("SET FOREIGN_KEY_CHECKS = 0")  # disable foreign key checks
-        cursor.execute("TRUNCATE TABLE people")        # clear people first (has foreign key)
-        cursor.execute("TRUNCATE TABLE places")        # clear places
-        cursor.execute("SET FOREIGN_KEY_CHECKS = 1")   # re-enable foreign key checks
-        conn.commit()
-        print("Existing data cleared.")
-        cursor = conn.cursor()
+        with connect(db_config) as (conn, cursor):
+            # clear existing data before loading new data
+            print("Clearing existing data...")
+            cursor.execute("SET FOREIGN_KEY_CHECKS = 0")  # disable foreign key checks
+            cursor.execute("TRUNCATE TABLE people")        # clear people first (has foreign key)
+            cursor.execute("TRUNCATE TABLE places")        # clear places
+            cursor.execute("SET FOREIGN_KEY_CHECKS = 1")   # re-enable foreign key checks
+            conn.commit()
+            print("Existing data cleared.")
         
-        # load places first (for foreign key references)
-        place_id_mapping = load_places_data(cursor, data_path)
-        conn.commit()
+            # run each table load as a single explicit transaction
+            conn.autocommit = False
         
-        # load people data
-        load_people_data(cursor, data_path, place_id_mapping)
-        conn.commit()
+            # load places first (for foreign key references)
+            cursor.execute("START TRANSACTION")
+            load_places_data(conn, cursor, data_path,
+                             config['batch_size'], config['commit_every'],
+                             config['load_method'])
+            conn.commit()
         
-        print("Data ingest completed successfully!")
+            # load people data - place IDs come from the join with places so checks
+            # can be deferred; places keeps unique_checks on as it relies on the unique key
+            cursor.execute("SET SESSION unique_checks = 0")
+            cursor.execute("SET SESSION foreign_key_checks = 0")
+        
+            # drop the place_of_birth_id index for the load and rebuild it after
+            # (ALTER TABLE commits implicitly, so keep it outside the transaction);
+            # note the foreign key's definition first so it comes back the same
+            foreign_key = find_people_place_foreign_key(cursor) or PEOPLE_PLACE_FOREIGN_KEY
+            try:
+                drop_people_place_index(cursor)
+                if config['workers'] > 1:
+                    # each worker commits its own share over its own connection, so
+                    # this is not one transaction; a failure truncates people below
+                    load_people_data_parallel(db_config, data_path, config['workers'],
+                                              config['batch_size'], config['commit_every'],
+                                              config['load_method'], config['read_chunk_size'])
+                else:
+                    cursor.execute("START TRANSACTION")
+                    load_people_data(conn, cursor, data_path,
+                                     config['batch_size'], config['commit_every'],
+                                     config['load_method'], config['read_chunk_size'])
+                    conn.commit()
+            except Exception:
+                if config['workers'] > 1:
+                    # workers commit their own byte ranges on their own connections,
+                    # so rolling back here undoes nothing; clear the partial load
+                    cursor.execute("TRUNCATE TABLE people")
+                else:
+                    conn.rollback()  # don't let the ALTER below commit a partial load
+                try:
+                    ensure_people_place_index(cursor, foreign_key)
+                except Exception as restore_error:
+                    # report it, but keep the original load error as the one raised
+                    print(f"Warning: could not restore people index/foreign key: {restore_error}")
+                raise
+            ensure_people_place_index(cursor, foreign_key)
+            cursor.execute("SET SESSION unique_checks = 1")
+            cursor.execute("SET SESSION foreign_key_checks = 1")
+        
+            # refresh index statistics so the summary query gets a good plan
+            cursor.execute("ANALYZE TABLE places, people")
+            cursor.fetchall()
+        
+            print("Data ingest completed successfully!")
 
-        # show places table count to check 
-        cursor.execute("SELECT COUNT(*) FROM places")
-        place_count = cursor.fetchone()[0]
-        print(f"\nPlaces table: {place_count} total records")
+            # show places table count to check 
+            cursor.execute("SELECT COUNT(*) FROM places")
+            place_count = cursor.fetchone()[0]
+            print(f"\nPlaces table: {place_count} total records")
         
-        # show people table count to check
-        cursor.execute("SELECT COUNT(*) FROM people")
-        people_count = cursor.fetchone()[0]
-        print(f"\nPeople table: {people_count} total records")
+            # show people table count to check
+            cursor.execute("SELECT COUNT(*) FROM people")
+            people_count = cursor.fetchone()[0]
+            print(f"\nPeople table: {people_count} total records")
         
     except Exception as e:
         print(f"Error during data ingest: {e}")
         sys.exit(1)
-    
-    finally:
-        if 'cursor' in locals():
-            cursor.close()
-        if 'conn' in locals():
-            conn.close()
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
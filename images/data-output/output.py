@@ -5,23 +5,16 @@ It waits for the database to be ready before executing queries and handles excep
 #!/usr/bin/env python3
 # images/data-output/output.py
 
-import mysql.connector
 import json
 import os
-import time
 import sys
-from typing import Dict, Any, List
+from typing import Dict, Any, Tuple
+
+from db_utils import connect, get_db_config, wait_for_database
 
 def get_config() -> Dict[str, Any]:
     """Get configuration from environment variables"""
     return {
-        # database config
-        'db_host': os.getenv('DB_HOST', 'database'),
-        'db_user': os.getenv('DB_USER', 'codetest'),
-        'db_password': os.getenv('DB_PASSWORD', 'swordfish'),
-        'db_name': os.getenv('DB_NAME', 'codetest'),
-        'db_port': int(os.getenv('DB_PORT', '3306')),
-        
         # file paths
         'data_path': os.getenv('DATA_PATH', '/data'),
         'output_file': os.getenv('OUTPUT_FILE', 'summary_output.json'),
@@ -30,42 +23,50 @@ def get_config() -> Dict[str, Any]:
         'encoding': os.getenv('FILE_ENCODING', 'utf-8'),
     }
 
-def wait_for_database(config: Dict[str, Any], max_retries: int = 30) -> None:
-    """Wait for database to be ready"""
-    for attempt in range(max_retries):
-        try:
-            conn = mysql.connector.connect(**config)
-            conn.close()
-            print("Database is ready!")
-            return
-        except mysql.connector.Error as e:
-            print(f"Attempt {attempt + 1}: Database not ready. Waiting... ({e})")
-            time.sleep(2)
+def generate_summary_output(cursor) -> Tuple[str, int]:
+    """Generate summary output with country counts, returning (JSON text, number of countries)"""
     
-    raise Exception("Database not available after maximum retries")
-
-def generate_summary_output(cursor) -> List[Dict[str, Any]]:
-    """Generate summary output with country counts"""
+    # the JSON is built by MySQL in the same layout as json.dump(..., indent=2);
+    # GROUP_CONCAT (unlike JSON_OBJECTAGG) keeps the ORDER BY. Allow results
+    # up to the packet size rather than the default 1024 bytes
+    cursor.execute("SET SESSION group_concat_max_len = @@max_allowed_packet")
     
-    # query to get country counts
+    # query to get country counts; GROUP_CONCAT silently cuts anything longer
+    # than group_concat_max_len, so report whether the entries reached it
     query = """
-    SELECT 
-        pl.country,
-        COUNT(p.id) as people_count
-    FROM places pl
-    LEFT JOIN people p ON pl.id = p.place_of_birth_id
-    GROUP BY pl.country
-    ORDER BY people_count DESC, pl.country ASC
+    SELECT
+        s.country_count,
+        COALESCE(CONCAT('{\\n', s.entries, '\\n}'), '{}'),
+        COALESCE(LENGTH(s.entries), 0) >= @@session.group_concat_max_len
+    FROM (
+        SELECT
+            COUNT(*) AS country_count,
+            GROUP_CONCAT(
+                CONCAT('  ', JSON_QUOTE(t.country), ': ', t.people_count)
+                ORDER BY t.people_count DESC, t.country ASC
+                SEPARATOR ',\\n'
+            ) AS entries
+        FROM (
+            SELECT 
+                pl.country,
+                COUNT(p.id) as people_count
+            FROM places pl
+            LEFT JOIN people p ON pl.id = p.place_of_birth_id
+            GROUP BY pl.country
+        ) t
+    ) s
     """
     
     cursor.execute(query)
-    results = cursor.fetchall()
+    country_count, summary_json, truncated = cursor.fetchone()
+    
+    if truncated:
+        raise ValueError("Summary is longer than group_concat_max_len; raise max_allowed_packet on the server")
     
-    summary_data = {}
-    for country, count in results:
-        summary_data[country] = count
+    if isinstance(summary_json, (bytes, bytearray)):
+        summary_json = summary_json.decode('utf-8')
     
-    return summary_data
+    return summary_json, country_count
 
 def main():
     """Main output function."""
@@ -75,13 +76,7 @@ def main():
     config = get_config()
     
     # database configuration
-    db_config = {
-        'host': config['db_host'],
-        'user': config['db_user'],
-        'password': config['db_password'],
-        'database': config['db_name'],
-        'charset': 'utf8mb4'
-    }
+    db_config = get_db_config()
     
     output_path = os.path.join(config['data_path'], config['output_file'])
     
@@ -90,33 +85,28 @@ def main():
         wait_for_database(db_config)
         
         # connect to database
-        conn = mysql.connector.connect(**db_config)
-        cursor = conn.cursor()
-        
-        # generate summary data
-        summary_data = generate_summary_output(cursor)
+        with connect(db_config) as (conn, cursor):
+            # generate summary data
+            summary_json, country_count = generate_summary_output(cursor)
         
-        # write to JSON file
-        with open(output_path, 'w', encoding=config['encoding']) as f:
-            json.dump(summary_data, f, indent=2, ensure_ascii=False)
+        # write to JSON file; write to a temporary file first so a failure
+        # never leaves a half-written summary
+        tmp_path = output_path + '.tmp'
+        with open(tmp_path, 'wb') as f:
+            f.write(summary_json.encode(config['encoding']))
+        os.replace(tmp_path, output_path)
         
         print(f"Summary output written to {output_path}")
-        print(f"Generated summary for {len(summary_data)} countries")
+        print(f"Generated summary for {country_count} countries")
         
         # print summary for verification
         print("\nSummary preview:")
-        for country, count in summary_data.items():
+        for country, count in json.loads(summary_json).items():
             print(f"  {country}: {count} people")
         
     except Exception as e:
         print(f"Error during output generation: {e}")
         sys.exit(1)
-    
-    finally:
-        if 'cursor' in locals():
-            cursor.close()
-        if 'conn' in locals():
-            conn.close()
 
 if __name__ == "__main__":
     main()
\ No newline at end of file